@@ -0,0 +1,510 @@
+#!/usr/bin/env python
+
+"""
+Queue position and order lifetime analytics for the limit order book simulation.
+"""
+
+# Copyright (c) 2012-2014, Lev Givon
+# All rights reserved.
+# Distributed under the terms of the BSD license:
+# http://www.opensource.org/licenses/bsd-license
+
+import _lob
+
+import array
+
+# Order outcomes:
+OPEN = 0
+FILLED = 1
+CANCELLED = 2
+EVICTED = 3
+
+# Numeric codes used to store buy/sell indicators:
+indicator_codes = {'B': 1, 'S': -1}
+code_indicators = {1: 'B', -1: 'S'}
+
+class CumulativeArray(object):
+    """
+    Array of numbers whose partial sums can be updated and computed in
+    logarithmic time.
+
+    Parameters
+    ----------
+    typecode : str
+        Type code of the array entries (see the `array` module).
+
+    Notes
+    -----
+    The entries are stored in a binary indexed (Fenwick) tree; entry `i` of
+    the tree contains the sum of the `i & -i` array entries up to and
+    including entry `i` (counting from 1).
+
+    """
+
+    def __init__(self, typecode):
+        self._tree = array.array(typecode)
+
+    def __len__(self):
+        return len(self._tree)
+
+    def append(self, value):
+        """
+        Append an entry to the end of the array.
+        """
+
+        i = len(self._tree)+1
+        self._tree.append(value+self.sum(i-1)-self.sum(i-(i & -i)))
+
+    def add(self, i, value):
+        """
+        Add a value to entry `i` of the array.
+        """
+
+        tree = self._tree
+        n = len(tree)
+        i += 1
+        while i <= n:
+            tree[i-1] += value
+            i += i & -i
+
+    def sum(self, n=None):
+        """
+        Return the sum of the first `n` entries of the array (or of all
+        entries if `n` is None).
+        """
+
+        tree = self._tree
+        if n is None:
+            n = len(tree)
+        total = 0
+        while n > 0:
+            total += tree[n-1]
+            n -= n & -n
+        return total
+
+class QueueAnalytics(object):
+    """
+    Queue position and order lifetime analytics.
+
+    Parameters
+    ----------
+    orders_log_file : str
+        File in which to log the queue position and outcome of each order
+        that rested in the book. If set to None, no orders are logged.
+    levels_log_file : str
+        File in which to log the lifetime of each price level. If set to None,
+        no levels are logged.
+    daily_stats_log_file : str
+        File in which to log daily summary stats. If set to None, no summary
+        stats are logged.
+
+    Notes
+    -----
+    Instances of this class are updated by `LimitOrderBook` as orders are
+    processed. The queue position of an order is given by the number and
+    total original volume of the orders ahead of it in its price level queue.
+    Consistent with the matching performed by `LimitOrderBook.add()`, orders
+    with zero disclosed volume are ahead of all orders with non-zero
+    disclosed volume in the same level; orders are otherwise ahead of those
+    that arrived after them. The queue position of each order is recorded
+    when it is added to the book and when it leaves the book; in between, it
+    changes as orders ahead of it trade, are cancelled, or have their volume
+    modified. Modify requests that increase the volume of an order do not
+    move it to the back of its queue. Changes in priority caused by modify
+    requests that alter the disclosed volume of an order are ignored. Orders
+    whose price is modified are treated as cancelled and replaced by a new
+    order.
+
+    Data for all orders and levels are accumulated in compact arrays until
+    they are written to the logs by `flush()`; orders and levels still in the
+    book when `flush()` is called are logged as open. Each order is assigned a
+    slot at the end of the queue of orders with the same disclosed volume
+    priority in its price level; the numbers and volumes of the orders in
+    each queue are stored in `CumulativeArray` instances, so that the queue
+    position of an order can be updated and computed without visiting the
+    orders behind or ahead of it.
+
+    """
+
+    def __init__(self, orders_log_file='orders.log.gz',
+                 levels_log_file='levels.log.gz',
+                 daily_stats_log_file='queue_stats.log.gz'):
+
+        self._orders_log_file = orders_log_file
+        if orders_log_file:
+            self._orders_log_fh, self._orders_log_writer = \
+                _lob.open_log(orders_log_file)
+        self._levels_log_file = levels_log_file
+        if levels_log_file:
+            self._levels_log_fh, self._levels_log_writer = \
+                _lob.open_log(levels_log_file)
+        self._daily_stats_log_file = daily_stats_log_file
+        if daily_stats_log_file:
+            self._daily_stats_log_fh, self._daily_stats_log_writer = \
+                _lob.open_log(daily_stats_log_file)
+
+        # Time of the order currently being processed (in seconds since
+        # midnight):
+        self._time = 0.0
+
+        # This dictionary maps the IDs of orders in the book to the indices of
+        # their data in the order arrays:
+        self._active_orders = {}
+
+        # This dictionary maps (indicator, price) tuples of levels in the book
+        # to their creation times:
+        self._active_levels = {}
+
+        # This dictionary maps (indicator, price) tuples of levels in the book
+        # to the queues of orders with zero and non-zero disclosed volumes in
+        # each level; each queue is a tuple containing the number of orders
+        # (0 or 1) and the current original volume in each slot:
+        self._queues = {}
+
+        self._init_arrays()
+
+    def __del__(self):
+
+        # Close all file handles before the object instance is cleaned up:
+        self.close()
+
+    def close(self):
+        """
+        Close the log files.
+        """
+
+        try:
+            self._orders_log_fh.close()
+        except:
+            pass
+        try:
+            self._levels_log_fh.close()
+        except:
+            pass
+        try:
+            self._daily_stats_log_fh.close()
+        except:
+            pass
+
+    def _init_arrays(self):
+        """
+        Create empty arrays for storing order and level data.
+        """
+
+        self._order_number = array.array('l')
+        self._order_indicator = array.array('b')
+        self._order_price = array.array('d')
+        self._order_priority = array.array('b')
+        self._order_slot = array.array('l')
+        self._order_volume = array.array('d')
+        self._order_orders_ahead = array.array('l')
+        self._order_volume_ahead = array.array('d')
+        self._order_orders_ahead_end = array.array('l')
+        self._order_volume_ahead_end = array.array('d')
+        self._order_start = array.array('d')
+        self._order_end = array.array('d')
+        self._order_filled = array.array('d')
+        self._order_outcome = array.array('b')
+
+        self._level_indicator = array.array('b')
+        self._level_price = array.array('d')
+        self._level_start = array.array('d')
+        self._level_end = array.array('d')
+
+    def set_time(self, t):
+        """
+        Set the time of the order currently being processed.
+
+        Parameters
+        ----------
+        t : str
+            Transaction time (HH:MM:SS.XXXXXX).
+
+        """
+
+        self._time = _lob.time_to_seconds(t)
+
+    def create_level(self, indicator, price):
+        """
+        Record the creation of a price level.
+        """
+
+        self._active_levels[(indicator, price)] = self._time
+        self._queues[(indicator, price)] = \
+            ((CumulativeArray('l'), CumulativeArray('d')),
+             (CumulativeArray('l'), CumulativeArray('d')))
+
+    def delete_level(self, indicator, price):
+        """
+        Record the deletion of a price level.
+        """
+
+        start = self._active_levels.pop((indicator, price))
+        del self._queues[(indicator, price)]
+        self._level_indicator.append(indicator_codes[indicator])
+        self._level_price.append(price)
+        self._level_start.append(start)
+        self._level_end.append(self._time)
+
+    def add_order(self, order):
+        """
+        Record the addition of an order to the end of its price level queue.
+
+        Parameters
+        ----------
+        order : dict
+            Order data.
+
+        """
+
+        indicator = order['buy_sell_indicator']
+        price = order['limit_price']
+        volume = order['volume_original']
+
+        # Orders with zero disclosed volume are only behind other such orders
+        # and move ahead of all orders with non-zero disclosed volume:
+        if order['volume_disclosed'] == 0:
+            priority = 0
+        else:
+            priority = 1
+        counts, volumes = self._queues[(indicator, price)][priority]
+
+        i = len(self._order_number)
+        self._active_orders[order['order_number']] = i
+        self._order_number.append(order['order_number'])
+        self._order_indicator.append(indicator_codes[indicator])
+        self._order_price.append(price)
+        self._order_priority.append(priority)
+        self._order_slot.append(len(counts))
+        self._order_volume.append(volume)
+        counts.append(1)
+        volumes.append(volume)
+
+        orders_ahead, volume_ahead = self._position(i)
+        self._order_orders_ahead.append(orders_ahead)
+        self._order_volume_ahead.append(volume_ahead)
+        self._order_orders_ahead_end.append(orders_ahead)
+        self._order_volume_ahead_end.append(volume_ahead)
+        self._order_start.append(self._time)
+        self._order_end.append(self._time)
+        self._order_filled.append(0)
+        self._order_outcome.append(OPEN)
+
+    def _queue(self, i):
+        """
+        Return the level queues and queue of the order with index `i`.
+        """
+
+        queues = self._queues[(code_indicators[self._order_indicator[i]],
+                               self._order_price[i])]
+        return queues, queues[self._order_priority[i]]
+
+    def _position(self, i):
+        """
+        Return the number and total volume of the orders ahead of the order
+        with index `i` in its price level.
+        """
+
+        queues, (counts, volumes) = self._queue(i)
+        slot = self._order_slot[i]
+        orders_ahead = counts.sum(slot)
+        volume_ahead = volumes.sum(slot)
+        if self._order_priority[i] == 1:
+            orders_ahead += queues[0][0].sum()
+            volume_ahead += queues[0][1].sum()
+        return orders_ahead, volume_ahead
+
+    def _set_volume(self, i, volume):
+        """
+        Change the volume of the order with index `i` without altering its
+        position in the queue.
+        """
+
+        queues, (counts, volumes) = self._queue(i)
+        volumes.add(self._order_slot[i], volume-self._order_volume[i])
+        self._order_volume[i] = volume
+
+    def _end_order(self, i):
+        """
+        Record the queue position of the order with index `i` when it leaves
+        the book.
+        """
+
+        orders_ahead, volume_ahead = self._position(i)
+        self._order_orders_ahead_end[i] = orders_ahead
+        self._order_volume_ahead_end[i] = volume_ahead
+        self._order_end[i] = self._time
+
+    def trade_order(self, order_number, volume, remaining):
+        """
+        Record a trade against an order in the book.
+
+        Parameters
+        ----------
+        order_number : int
+            Number of order in the book.
+        volume : int
+            Traded volume.
+        remaining : int
+            Volume of the order in the book after the trade.
+
+        """
+
+        i = self._active_orders[order_number]
+        self._order_filled[i] += volume
+        if self._order_volume[i] != remaining:
+            self._set_volume(i, remaining)
+        if remaining <= 0:
+            self._order_outcome[i] = FILLED
+
+    def modify_order(self, order_number, volume):
+        """
+        Record a modify request that changes the volume of an order in the book.
+
+        Parameters
+        ----------
+        order_number : int
+            Number of order in the book.
+        volume : int
+            New volume of the order.
+
+        """
+
+        i = self._active_orders[order_number]
+        if self._order_volume[i] != volume:
+            self._set_volume(i, volume)
+
+    def evict_order(self, order_number):
+        """
+        Record that an order is about to be evicted from the book.
+        """
+
+        self._order_outcome[self._active_orders[order_number]] = EVICTED
+
+    def delete_order(self, order_number):
+        """
+        Record the removal of an order from the book.
+
+        Notes
+        -----
+        Orders removed without having been exhausted by trades or evicted are
+        recorded as cancelled.
+
+        """
+
+        i = self._active_orders.pop(order_number)
+        self._end_order(i)
+        if self._order_outcome[i] == OPEN:
+            self._order_outcome[i] = CANCELLED
+        queues, (counts, volumes) = self._queue(i)
+        slot = self._order_slot[i]
+        counts.add(slot, -1)
+        volumes.add(slot, -self._order_volume[i])
+        self._order_volume[i] = 0
+
+    def flush(self, d):
+        """
+        Log the accumulated order and level data and daily summary stats.
+
+        Parameters
+        ----------
+        d : str
+            Date.
+
+        Notes
+        -----
+        All accumulated data is discarded after it is logged.
+
+        """
+
+        # Orders and levels still in the book are logged as open:
+        for i in self._active_orders.itervalues():
+            self._end_order(i)
+        self._active_orders.clear()
+        self._queues.clear()
+        for (indicator, price), start in self._active_levels.iteritems():
+            self._level_indicator.append(indicator_codes[indicator])
+            self._level_price.append(price)
+            self._level_start.append(start)
+            self._level_end.append(self._time)
+        self._active_levels.clear()
+
+        if self._orders_log_file:
+            for i in xrange(len(self._order_number)):
+                self._orders_log_writer.writerow(
+                    [d, self._order_number[i],
+                     code_indicators[self._order_indicator[i]],
+                     self._order_price[i],
+                     self._order_orders_ahead[i],
+                     self._order_volume_ahead[i],
+                     self._order_orders_ahead_end[i],
+                     self._order_volume_ahead_end[i],
+                     self._order_start[i],
+                     self._order_end[i]-self._order_start[i],
+                     self._order_filled[i],
+                     self._order_outcome[i]])
+        if self._levels_log_file:
+            for i in xrange(len(self._level_price)):
+                self._levels_log_writer.writerow(
+                    [d, code_indicators[self._level_indicator[i]],
+                     self._level_price[i],
+                     self._level_start[i],
+                     self._level_end[i]-self._level_start[i]])
+        if self._daily_stats_log_file:
+            stats = self.daily_stats()
+            self._daily_stats_log_writer.writerow(
+                [d, stats['num_orders'],
+                 stats['num_filled'],
+                 stats['num_cancelled'],
+                 stats['num_evicted'],
+                 stats['fill_ratio'],
+                 stats['time_to_fill_mean'],
+                 stats['time_to_cancel_mean'],
+                 stats['volume_ahead_filled_mean'],
+                 stats['volume_ahead_cancelled_mean'],
+                 stats['num_levels'],
+                 stats['level_lifetime_mean']])
+
+        self._init_arrays()
+
+    def daily_stats(self):
+        """
+        Compute summary stats for the accumulated order and level data.
+
+        Returns
+        -------
+        stats : dict
+            Numbers of orders with each outcome, fraction of orders that were
+            filled, mean times to fill and cancel, mean volumes ahead of
+            filled and cancelled orders, number of levels, and mean level
+            lifetime.
+
+        """
+
+        n = {OPEN: 0, FILLED: 0, CANCELLED: 0, EVICTED: 0}
+        duration = {OPEN: 0.0, FILLED: 0.0, CANCELLED: 0.0, EVICTED: 0.0}
+        volume_ahead = {OPEN: 0.0, FILLED: 0.0, CANCELLED: 0.0, EVICTED: 0.0}
+        for i in xrange(len(self._order_number)):
+            outcome = self._order_outcome[i]
+            n[outcome] += 1
+            duration[outcome] += self._order_end[i]-self._order_start[i]
+            volume_ahead[outcome] += self._order_volume_ahead[i]
+        num_orders = sum(n.values())
+        num_levels = len(self._level_price)
+        level_lifetime_total = \
+            sum(self._level_end[i]-self._level_start[i] \
+                for i in xrange(num_levels))
+
+        mean = lambda total, count: total/count if count else 0.0
+        return {'num_orders': num_orders,
+                'num_filled': n[FILLED],
+                'num_cancelled': n[CANCELLED],
+                'num_evicted': n[EVICTED],
+                'fill_ratio': mean(float(n[FILLED]), num_orders),
+                'time_to_fill_mean': mean(duration[FILLED], n[FILLED]),
+                'time_to_cancel_mean': mean(duration[CANCELLED], n[CANCELLED]),
+                'volume_ahead_filled_mean': mean(volume_ahead[FILLED], n[FILLED]),
+                'volume_ahead_cancelled_mean': mean(volume_ahead[CANCELLED],
+                                                    n[CANCELLED]),
+                'num_levels': num_levels,
+                'level_lifetime_mean': mean(level_lifetime_total, num_levels)}
@@ -15,13 +15,17 @@ import csv
 import datetime
 import gzip
 import logging
-import numpy as np
+import math
 import odict
 import os
-import pandas
 import sys
 import time
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
 col_names = \
   ['record_indicator',
    'segment',
@@ -46,10 +50,260 @@ col_names = \
    'algo_ind',
    'client_id_flag']
 
+# Types of the columns; columns not listed are strings:
+col_types = \
+  {'order_number': int,
+   'activity_type': int,
+   'strike_price': int,
+   'volume_disclosed': int,
+   'volume_original': int,
+   'limit_price': float,
+   'trigger_price': float,
+   'algo_ind': int,
+   'client_id_flag': int}
+
+# Indices of the columns in each row of order data:
+col_index = dict((k, i) for i, k in enumerate(col_names))
+
 # Some aliases for bids and asks:
 BID = BUY = 'B'
 ASK = SELL = 'S'
 
+def is_gzipped(file_name):
+    """
+    Check whether a file is compressed with gzip.
+    """
+
+    with gzip.open(file_name, 'rb') as f:
+        try:
+            f.read(1)
+        except IOError:
+            return False
+        else:
+            return True
+
+def peak_memory():
+    """
+    Return the peak resident memory of the process.
+
+    Returns
+    -------
+    peak : int
+        Maximum resident set size of the current process (in kilobytes), or
+        None if this cannot be determined. Since all books in a process share
+        its memory, this value is not specific to any single book.
+
+    """
+
+    if resource is None:
+        return None
+
+    # Mac OS X reports the maximum resident set size in bytes rather than
+    # kilobytes:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return peak
+
+def time_to_seconds(t):
+    """
+    Convert a transaction time (HH:MM:SS.XXXXXX) to seconds since midnight.
+    """
+
+    h, m, s = t.split(':')
+    return int(h)*3600+int(m)*60+float(s)
+
+def open_log(file_name):
+    """
+    Open a CSV log file for writing.
+
+    Returns
+    -------
+    fh : file
+        Log file.
+    writer : csv.writer
+        CSV writer for the log file.
+
+    Notes
+    -----
+    If the file name ends with the string '.gz', the log is automatically
+    compressed.
+
+    """
+
+    if os.path.splitext(file_name)[1] == '.gz':
+        fh = gzip.open(file_name, 'w')
+    else:
+        fh = open(file_name, 'w')
+    return fh, csv.writer(fh)
+
+def read_rows(file_name, chunk_size=500):
+    """
+    Read unparsed order data from a file without using pandas.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of CSV file containing order data. The file may be compressed
+        with gzip.
+    chunk_size : int
+        Number of rows in each chunk.
+
+    Returns
+    -------
+    chunks : generator
+        Generator of lists of rows; each row is a list of strings whose
+        entries correspond to the column names in `col_names`. Blank lines
+        and rows with a different number of entries are skipped.
+
+    """
+
+    if is_gzipped(file_name):
+        f = gzip.open(file_name, 'rb')
+    else:
+        f = open(file_name, 'rb')
+    try:
+        rows = []
+        reader = csv.reader(f)
+        for row in reader:
+
+            # Skip blank lines and rows that cannot be parsed:
+            if not row:
+                continue
+            if len(row) != len(col_names):
+                logging.getLogger('lob').warning(
+                    'skipping malformed row: %s, line %s' % \
+                    (file_name, reader.line_num))
+                continue
+            rows.append(row)
+            if len(rows) == chunk_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+    finally:
+        f.close()
+
+def rows_to_orders(rows):
+    """
+    Convert unparsed rows of order data to orders.
+
+    Parameters
+    ----------
+    rows : list of list of str
+        Rows of order data returned by `read_rows()`.
+
+    Returns
+    -------
+    orders : list of dict
+        Orders whose keys are the column names in `col_names`.
+
+    """
+
+    orders = []
+    for row in rows:
+        order = dict(zip(col_names, row))
+        for k, t in col_types.iteritems():
+            order[k] = t(order[k])
+        orders.append(order)
+    return orders
+
+def read_orders(file_name, chunk_size=500):
+    """
+    Read order data from a file without using pandas.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of CSV file containing order data. The file may be compressed
+        with gzip.
+    chunk_size : int
+        Number of orders in each chunk.
+
+    Returns
+    -------
+    chunks : generator
+        Generator of lists of orders; each order is a dict whose keys are the
+        column names in `col_names`.
+
+    """
+
+    for rows in read_rows(file_name, chunk_size):
+        yield rows_to_orders(rows)
+
+def filter_orders(df, expiry_date=None, symbol=None, instrument=None,
+                  start_time=None, end_time=None, activity_types=None):
+    """
+    Select the orders that satisfy the specified criteria.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or list of list of str
+        Each row of this DataFrame instance (or each unparsed row returned
+        by `read_rows()`) contains a single order.
+    expiry_date : str
+        Only retain orders with this expiry date (MM/DD/YYYY).
+    symbol : str
+        Only retain orders for this firm identifier.
+    instrument : str
+        Only retain orders for this instrument.
+    start_time : str
+        Only retain orders with transaction times at or after this time
+        (HH:MM:SS.XXXXXX).
+    end_time : str
+        Only retain orders with transaction times before this time
+        (HH:MM:SS.XXXXXX).
+    activity_types : sequence of int
+        Only retain orders with these activity types.
+
+    Returns
+    -------
+    df : pandas.DataFrame or list of list of str
+        Orders that satisfy all of the specified criteria. Criteria set to
+        None are ignored.
+
+    Notes
+    -----
+    The criteria are evaluated over entire columns at once, so orders that
+    are irrelevant to the simulation can be dropped without incurring the
+    per-order cost of `LimitOrderBook.process()`. Unparsed rows are
+    converted to an array of strings whose columns are compared to the
+    criteria in the same manner as those of a DataFrame, so that rows are only
+    parsed if they satisfy the criteria; each row must contain an entry for
+    every column in `col_names`.
+
+    """
+
+    import numpy as np
+    if isinstance(df, list):
+        if not df:
+            return df
+        table = np.array(df)
+        get_column = lambda k: table[:, col_index[k]]
+        if activity_types is not None:
+            activity_types = [str(a) for a in activity_types]
+    else:
+        get_column = lambda k: df[k].values
+
+    mask = np.ones(len(df), dtype=bool)
+    if expiry_date is not None:
+        mask &= get_column('expiry_date') == expiry_date
+    if symbol is not None:
+        mask &= get_column('symbol') == symbol
+    if instrument is not None:
+        mask &= get_column('instrument') == instrument
+    if start_time is not None:
+        mask &= get_column('trans_time') >= start_time
+    if end_time is not None:
+        mask &= get_column('trans_time') < end_time
+    if activity_types is not None:
+        mask &= np.in1d(get_column('activity_type'), activity_types)
+    if mask.all():
+        return df
+    if isinstance(df, list):
+        return table[mask].tolist()
+    return df[mask]
+
 class LimitOrderBook(object):
     """
     Limit order book for Indian exchange.
@@ -67,16 +321,44 @@ class LimitOrderBook(object):
         File in which to log running stats. If set to None, no running stats are logged.
     daily_stats_file : bool
         File in which to log accumulated daily stats. If set to None, no daily stats are logged.
+    max_resting_orders : int
+        Maximum number of orders permitted to rest in the book; when exceeded,
+        the oldest resting orders are evicted. If set to None, the number of
+        resting orders is not bounded.
+    max_level_ticks : int
+        Maximum distance (in ticks) from the best bid or ask beyond which
+        price levels are evicted from the book. If set to None, no levels are
+        evicted on account of their distance from the touch.
+    tick_size : float
+        Price tick size used to compute the distance of price levels from
+        the best bid or ask.
+    max_order_age : float
+        Maximum time (in seconds) an order may rest in the book before it is
+        evicted. If set to None, orders are not evicted on account of their age.
+    far_levels_log_file : str
+        File in which to log the evicted far-from-touch price levels of each
+        day. If set to None, evicted levels are not logged.
+    analytics : _analytics.QueueAnalytics
+        Object updated with the queue position and lifetime of each order and
+        price level in the book. If set to None, no such analytics are computed.
 
     Notes
     -----
     If the file names specified for storing events or stats end with the string '.gz', the log is automatically
     compressed.
+
+    Evicted orders are removed from the book as if they had been cancelled;
+    subsequent requests that refer to them are ignored. The number of orders
+    and total volumes of evicted far-from-touch price levels are retained in a
+    compact side store that can be accessed via the `far_levels()` method and
+    is logged with the daily stats.
     
     """
     
     def __init__(self, show_output=True, sparse_events=True, events_log_file='events.log.gz',
-                 stats_log_file='stats.log.gz', daily_stats_log_file='daily_stats.log.gz'):
+                 stats_log_file='stats.log.gz', daily_stats_log_file='daily_stats.log.gz',
+                 max_resting_orders=None, max_level_ticks=None, tick_size=0.05,
+                 max_order_age=None, far_levels_log_file=None, analytics=None):
         self.logger = logging.getLogger('lob')
 
         self._show_output = show_output
@@ -122,8 +404,50 @@ class LimitOrderBook(object):
             copy.copy(self._init_last_book_best_values)
         
         # This dictionary maps the IDs of orders that are in the book to their
-        # price level:
-        self._book_orders_to_price = {}
+        # price level. If orders are to be evicted by count or age, an ordered
+        # dict is used so that the oldest resting order can be found without
+        # scanning the entire book:
+        if max_resting_orders is not None or max_order_age is not None:
+            self._book_orders_to_price = odict.odict()
+        else:
+            self._book_orders_to_price = {}
+
+        # Retention policies used to bound the memory occupied by resting
+        # orders:
+        self._max_resting_orders = max_resting_orders
+        self._max_level_ticks = max_level_ticks
+        self._tick_size = tick_size
+        self._max_order_age = max_order_age
+
+        # This dictionary maps the IDs of orders that are in the book to their
+        # arrival times; it is only used if orders are to be evicted by age:
+        self._book_order_arrivals = {}
+
+        # Queue position and lifetime analytics are accumulated in this
+        # object:
+        self._analytics = analytics
+
+        # Price levels evicted because of their distance from the best bid or
+        # ask are summarized in these dictionaries; each maps a price to a
+        # list containing the number of evicted orders and their total
+        # original and disclosed volumes:
+        self._far_level_data = {}
+        self._far_level_data[BID] = {}
+        self._far_level_data[ASK] = {}
+
+        # Evicted price levels are written to this file:
+        self._far_levels_log_file = far_levels_log_file
+        if far_levels_log_file:
+            self._far_levels_log_fh, self._far_levels_log_writer = \
+                open_log(far_levels_log_file)
+
+        # Counters of evicted orders and levels:
+        self._retention_stats = {
+            'evicted_max_orders': 0,
+            'evicted_max_age': 0,
+            'evicted_far_orders': 0,
+            'evicted_far_levels': 0,
+            'peak_resting_orders': 0}
                 
         # Generated events counter:
         self._event_counter = 1
@@ -139,29 +463,20 @@ class LimitOrderBook(object):
         # Events are written to this file:
         self._events_log_file = events_log_file
         if events_log_file:
-            if os.path.splitext(events_log_file)[1] == '.gz':
-                self._events_log_fh = gzip.open(events_log_file, 'w')
-            else:
-                self._events_log_fh = open(events_log_file, 'w')
-            self._events_log_writer = csv.writer(self._events_log_fh)
+            self._events_log_fh, self._events_log_writer = \
+                open_log(events_log_file)
 
         # Stats are written to this file:
         self._stats_log_file = stats_log_file
         if stats_log_file:
-            if os.path.splitext(stats_log_file)[1] == '.gz':
-                self._stats_log_fh = gzip.open(stats_log_file, 'w')                
-            else:
-                self._stats_log_fh = open(stats_log_file, 'w')
-            self._stats_log_writer = csv.writer(self._stats_log_fh)
+            self._stats_log_fh, self._stats_log_writer = \
+                open_log(stats_log_file)
 
         # Daily stats are written to this file:
         self._daily_stats_log_file = daily_stats_log_file
         if daily_stats_log_file:
-            if os.path.splitext(daily_stats_log_file)[1] == '.gz':
-                self._daily_stats_log_fh = gzip.open(daily_stats_log_file, 'w')
-            else:
-                self._daily_stats_log_fh = open(daily_stats_log_file, 'w')
-            self._daily_stats_log_writer = csv.writer(self._daily_stats_log_fh)
+            self._daily_stats_log_fh, self._daily_stats_log_writer = \
+                open_log(daily_stats_log_file)
 
         # Values with which to initialize daily stats:
         self._init_daily_stats = {
@@ -191,6 +506,13 @@ class LimitOrderBook(object):
     def __del__(self):
 
         # Close all file handles before the object instance is cleaned up:
+        self.close()
+
+    def close(self):
+        """
+        Close the log files of the book and of its analytics.
+        """
+
         try:
             self._events_log_fh.close()            
         except:
@@ -203,6 +525,12 @@ class LimitOrderBook(object):
             self._daily_stats_log_fh.close()
         except:
             pass
+        try:
+            self._far_levels_log_fh.close()
+        except:
+            pass
+        if self._analytics is not None:
+            self._analytics.close()
         
     def clear_book(self):
         """
@@ -215,8 +543,10 @@ class LimitOrderBook(object):
             self._book_data[d].clear()
             self._book_prices[d].clear()
             self._price_level_stats[d].clear()
+            self._far_level_data[d].clear()
             self.day = None
         self._book_orders_to_price.clear()
+        self._book_order_arrivals.clear()
 
     def process(self, df):
         """
@@ -224,13 +554,17 @@ class LimitOrderBook(object):
 
         Parameters
         ----------
-        df : pandas.DataFrame
-            Each row of this DataFrame instance contains a single order.
+        df : pandas.DataFrame or list of dict
+            Each row of this DataFrame instance (or each entry in the list)
+            contains a single order.
             
         """
-                
-        for row in df.iterrows():
-            order = row[1].to_dict()
+
+        if isinstance(df, list):
+            orders = df
+        else:
+            orders = (row[1].to_dict() for row in df.iterrows())
+        for order in orders:
             self.logger.info('processing order: %i (%s, %s)' % (order['order_number'],
                                                                 order['trans_date'],
                                                                 order['trans_time']))
@@ -239,7 +573,7 @@ class LimitOrderBook(object):
             if self.day != trans_date.day:
 
                 # Save the daily stats:
-                if self._daily_stats_log_file and self.day is not None:
+                if self.day is not None:
                    self.record_daily_stats(self.day)
                    
                 # Reset the limit order book and trade volume variables when a new
@@ -264,6 +598,9 @@ class LimitOrderBook(object):
                 self._last_book_best_values = \
                     copy.copy(self._init_last_book_best_values)
                     
+            if self._analytics is not None:
+                self._analytics.set_time(order['trans_time'])
+
             # Restrict all orders processed to a single expiry date because
             # futures orders with different expiry dates are effectively
             # distinct securities insofar as the LOB is concerned:
@@ -291,6 +628,9 @@ class LimitOrderBook(object):
                 raise ValueError('unrecognized activity type %i' % \
                                  order['activity_type'])                
 
+            # Evict resting orders that violate the retention policies:
+            self.enforce_retention()
+
     def create_level(self, indicator, price):
         """
         Create a new empty price level queue.
@@ -316,6 +656,8 @@ class LimitOrderBook(object):
         self._price_level_stats[indicator][price] = \
             copy.copy(self._init_price_level_stats)
         self.logger.info('created new price level: %s, %f' % (indicator, price))
+        if self._analytics is not None:
+            self._analytics.create_level(indicator, price)
         return od
     
     def delete_level(self, indicator, price):
@@ -335,6 +677,8 @@ class LimitOrderBook(object):
         del self._book_prices[indicator][price]
         self._price_level_stats[indicator].pop(price)
         self.logger.info('deleted price level: %s, %f' % (indicator, price))
+        if self._analytics is not None:
+            self._analytics.delete_level(indicator, price)
 
     def add_order(self, order):
         """
@@ -357,7 +701,27 @@ class LimitOrderBook(object):
         if od is None:
             self.logger.info('no matching price level found')
             od = self.create_level(indicator, price)
+
+        # Record the position of the order in the price level queue; orders
+        # whose volume is increased by a modify request are already in the
+        # queue and retain their position, but their stored volume is
+        # replaced:
+        if self._analytics is not None:
+            if order_number not in od:
+                self._analytics.add_order(order)
+            else:
+                self._analytics.modify_order(order_number,
+                                             order['volume_original'])
         
+        # Orders whose volume is increased by a modify request are added
+        # again without changing their arrival time:
+        if self._max_order_age is not None and \
+               order_number not in self._book_order_arrivals:
+            self._book_order_arrivals[order_number] = \
+              datetime.datetime.strptime(order['trans_date']+' '+\
+                                         order['trans_time'],
+                                         '%m/%d/%Y %H:%M:%S.%f')
+
         od[order_number] = order
         self._book_orders_to_price[order_number] = od
         
@@ -392,6 +756,7 @@ class LimitOrderBook(object):
         except:
             self.logger.info('order not found: %s' % order_number)
         else:
+            self._book_order_arrivals.pop(order_number, None)
             order = od.pop(order_number)
             indicator = order['buy_sell_indicator']
             price = order['limit_price']
@@ -404,11 +769,157 @@ class LimitOrderBook(object):
 
             self.logger.info('deleted order: %s, %s, %s' % \
                              (order_number, indicator, price))    
+            if self._analytics is not None:
+                self._analytics.delete_order(order_number)
             
             # If the price level queue contains no other orders, remove it:
             if not od:
                 self.delete_level(indicator, price)
-            
+
+    def evict_level(self, indicator, price):
+        """
+        Evict an existing price level and all of its orders.
+
+        Parameters
+        ----------
+        indicator : str
+            Indicate whether to evict a buy ('B') or sell ('S') price level.
+        price : float
+            Price associated with level.
+
+        Notes
+        -----
+        The number of orders and total volumes of the evicted level are
+        accumulated in the far level side store.
+
+        """
+
+        od = self._book_data[indicator][price]
+        for order_number in od.keys():
+            del self._book_orders_to_price[order_number]
+            self._book_order_arrivals.pop(order_number, None)
+            if self._analytics is not None:
+                self._analytics.evict_order(order_number)
+                self._analytics.delete_order(order_number)
+
+        # Only retain summary data for the evicted orders:
+        level_stats = self._price_level_stats[indicator][price]
+        far_level = self._far_level_data[indicator].setdefault(price, [0, 0, 0])
+        far_level[0] += len(od)
+        far_level[1] += level_stats['volume_original_total']
+        far_level[2] += level_stats['volume_disclosed_total']
+
+        self._retention_stats['evicted_far_orders'] += len(od)
+        self._retention_stats['evicted_far_levels'] += 1
+        self.logger.info('evicted price level: %s, %f' % (indicator, price))
+        self.delete_level(indicator, price)
+
+    def enforce_retention(self):
+        """
+        Evict resting orders that violate the retention policies.
+
+        Notes
+        -----
+        Price levels that are too far from the best bid or ask are evicted
+        first, followed by orders that are too old and by the oldest orders
+        in excess of the maximum number of resting orders. The age of
+        resting orders is measured from the time they were first added to the
+        book to the time of the last original order.
+
+        """
+
+        # Evict buy levels below the best bid and sell levels above the best
+        # ask that are more than the maximum number of ticks away:
+        if self._max_level_ticks is not None:
+            best_bid_price = self.best_bid_price()
+            if best_bid_price is not None:
+                prices = self._book_prices[BID]
+                while round((best_bid_price-prices.min())/self._tick_size) > \
+                      self._max_level_ticks:
+                    self.evict_level(BID, prices.min())
+            best_ask_price = self.best_ask_price()
+            if best_ask_price is not None:
+                prices = self._book_prices[ASK]
+                while round((prices.max()-best_ask_price)/self._tick_size) > \
+                      self._max_level_ticks:
+                    self.evict_level(ASK, prices.max())
+
+        # Evict orders that have rested longer than the maximum age:
+        if self._max_order_age is not None:
+            while self._book_orders_to_price:
+                order_number = self._book_orders_to_price.firstkey()
+                arrival_time = self._book_order_arrivals[order_number]
+                if (self._last_order_time-arrival_time).total_seconds() <= \
+                       self._max_order_age:
+                    break
+                order = self._book_orders_to_price[order_number][order_number]
+                self.logger.info('evicting aged order: %s' % order_number)
+                if self._analytics is not None:
+                    self._analytics.evict_order(order_number)
+                self.delete_order(order)
+                self._retention_stats['evicted_max_age'] += 1
+
+        # Evict the oldest orders in excess of the maximum number of resting
+        # orders:
+        if self._max_resting_orders is not None:
+            while len(self._book_orders_to_price) > self._max_resting_orders:
+                order_number = self._book_orders_to_price.firstkey()
+                order = self._book_orders_to_price[order_number][order_number]
+                self.logger.info('evicting excess order: %s' % order_number)
+                if self._analytics is not None:
+                    self._analytics.evict_order(order_number)
+                self.delete_order(order)
+                self._retention_stats['evicted_max_orders'] += 1
+
+        # Only the orders that remain after eviction count towards the peak:
+        n = len(self._book_orders_to_price)
+        if n > self._retention_stats['peak_resting_orders']:
+            self._retention_stats['peak_resting_orders'] = n
+
+    def far_levels(self, indicator):
+        """
+        Return summary data for evicted far-from-touch price levels.
+
+        Parameters
+        ----------
+        indicator : str
+            Indicate whether to return buy ('B') or sell ('S') price levels.
+
+        Returns
+        -------
+        levels : list of tuple
+            Price, number of evicted orders, total original volume, and total
+            disclosed volume of each evicted level, sorted by price.
+
+        """
+
+        return [(price,)+tuple(data) for price, data in \
+                sorted(self._far_level_data[indicator].items())]
+
+    def retention_stats(self):
+        """
+        Return counters of evicted orders and resting orders.
+
+        Returns
+        -------
+        stats : dict
+            Numbers of orders evicted by each retention policy, number of
+            evicted price levels, number of levels in the far level side
+            store, and current and peak numbers of resting orders.
+
+        Notes
+        -----
+        The memory used by the book cannot be separated from that of the
+        process; see `peak_memory()`.
+
+        """
+
+        stats = copy.copy(self._retention_stats)
+        stats['resting_orders'] = len(self._book_orders_to_price)
+        stats['far_levels'] = \
+            len(self._far_level_data[BID])+len(self._far_level_data[ASK])
+        return stats
+
     def best_bid_price(self):
         """
         Return the best bid price defined in the book.
@@ -603,7 +1114,7 @@ class LimitOrderBook(object):
                     (self._curr_daily_stats['trade_price_mean']*N_prev+\
                     event['price'])/N
                 self._curr_daily_stats['trade_price_std'] = \
-                  np.sqrt((self._curr_daily_stats['trade_price_std']**2*N_prev+\
+                  math.sqrt((self._curr_daily_stats['trade_price_std']**2*N_prev+\
                           (event['price']-self._curr_daily_stats['trade_price_mean'])**2)/N)
 
         if self._show_output:
@@ -685,6 +1196,12 @@ class LimitOrderBook(object):
                    self._curr_daily_stats['trade_price_std'],
                    self._curr_daily_stats['mean_order_interarrival_time']]
             self._daily_stats_log_writer.writerow(row)
+        if self._far_levels_log_file:
+            for indicator in (BID, ASK):
+                for level in self.far_levels(indicator):
+                    self._far_levels_log_writer.writerow([d, indicator]+list(level))
+        if self._analytics is not None:
+            self._analytics.flush(d)
             
     def add(self, new_order, is_original):
         """
@@ -823,6 +1340,9 @@ class LimitOrderBook(object):
                         # Record running stats:
                         self.record_stats(event['time'], event['date'])
                         
+                        if self._analytics is not None:
+                            self._analytics.trade_order(curr_order['order_number'],
+                                                        volume_original, 0)
                         self.delete_order(curr_order) 
                         volume_original = 0.0                 
                         break
@@ -857,6 +1377,10 @@ class LimitOrderBook(object):
                                 -= volume_original
                         else:
                             self.logger.info('IOC order - residual volume discarded')
+                        if self._analytics is not None:
+                            self._analytics.trade_order(curr_order['order_number'],
+                                                        volume_original,
+                                                        curr_order['volume_original'])
                         volume_original = 0.0
                         break
 
@@ -888,6 +1412,9 @@ class LimitOrderBook(object):
                         # Record running stats:
                         self.record_stats(event['time'], event['date'])
                         
+                        if self._analytics is not None:
+                            self._analytics.trade_order(curr_order['order_number'],
+                                                        curr_order['volume_original'], 0)
                         volume_original -= curr_order['volume_original']
                         self.delete_order(curr_order)
                     else:
@@ -1017,6 +1544,9 @@ class LimitOrderBook(object):
                             event['volume_disclosed'] = volume_disclosed
                             self.record_event(**event)
 
+                            if self._analytics is not None:
+                                self._analytics.trade_order(curr_order['order_number'],
+                                                            volume_original, 0)
                             self.delete_order(curr_order)
                             volume_original = 0.0
                             break
@@ -1052,6 +1582,10 @@ class LimitOrderBook(object):
     
                             else:
                                 self.logger.info('IOC order - residual volume discarded')
+                            if self._analytics is not None:
+                                self._analytics.trade_order(curr_order['order_number'],
+                                                            volume_original,
+                                                            curr_order['volume_original'])
                             volume_original = 0.0
                             break
 
@@ -1079,6 +1613,9 @@ class LimitOrderBook(object):
                             # Record running stats:
                             self.record_stats(event['time'], event['date'])
                             
+                            if self._analytics is not None:
+                                self._analytics.trade_order(curr_order['order_number'],
+                                                            curr_order['volume_original'], 0)
                             volume_original -= curr_order['volume_original']
                             self.delete_order(curr_order) 
                         else:
@@ -1153,6 +1690,9 @@ class LimitOrderBook(object):
                                   old_order['volume_original'], old_order['volume_disclosed'],
                                   new_order['volume_original'], new_order['volume_disclosed']))
                 od[new_order['order_number']] = new_order
+                if self._analytics is not None:
+                    self._analytics.modify_order(new_order['order_number'],
+                                                 new_order['volume_original'])
 
                 # Update price level stats:
                 self._price_level_stats[new_order['buy_sell_indicator']][new_order['limit_price']]['volume_original_total'] \
@@ -1276,4 +1816,18 @@ class LimitOrderBook(object):
         print 'Mean trade price:             ', self._curr_daily_stats['trade_price_mean']
         print 'Trade price STD:              ', self._curr_daily_stats['trade_price_std']
         print 'Mean order interarrival time: ', self._curr_daily_stats['mean_order_interarrival_time']
+
+    def print_retention_stats(self):
+        """
+        Display counters of evicted orders and resting orders.
+        """
+
+        stats = self.retention_stats()
+        print '--------------------------------------------'
+        print 'Orders evicted (max orders):  ', stats['evicted_max_orders']
+        print 'Orders evicted (max age):     ', stats['evicted_max_age']
+        print 'Orders evicted (far levels):  ', stats['evicted_far_orders']
+        print 'Levels evicted (far levels):  ', stats['evicted_far_levels']
+        print 'Far levels retained:          ', stats['far_levels']
+        print 'Peak resting orders:          ', stats['peak_resting_orders']
         
@@ -9,52 +9,105 @@ Limit order book simulation for Indian security exchange.
 # Distributed under the terms of the BSD license:
 # http://www.opensource.org/licenses/bsd-license
 
+import _analytics
 import _lob
 
-import gzip
 import logging
 import os
-import pandas
 import sys
 import time
 
 usage = \
 """
 Usage: %s <firm name> <output directory> <input file names>
-""" % sys.argv[0]
+       %s --worker
+       %s --socket <socket file name>
 
-if __name__ == '__main__':
-    if len(sys.argv) < 4:
-        print usage
-        sys.exit(0)
-    else:
-        firm_name, output_dir = sys.argv[1:3]
-        file_name_list = sys.argv[3:]
-        
-    start = time.time()
+In worker mode, each line read from stdin (or from a connection to the
+specified Unix socket) must contain the arguments of a single job, i.e., a
+firm name, output directory, and list of input file names separated by
+whitespace. The status of each job is reported on a separate line; the
+simulation output is written to stderr.
+""" % (sys.argv[0], sys.argv[0], sys.argv[0])
 
-    # Suppress log generation when not in debug mode:
-    DEBUG = False
+# Suppress log generation when not in debug mode:
+DEBUG = False
+
+# Only process orders that occurred within this time window (HH:MM:SS.XXXXXX);
+# set to None to disable:
+START_TIME = None
+END_TIME = None
+
+# Retention policies for bounding the memory occupied by resting orders;
+# set to None to disable:
+MAX_RESTING_ORDERS = None
+MAX_LEVEL_TICKS = None
+MAX_ORDER_AGE = None
+
+# Log the queue position and lifetime of each order and price level:
+QUEUE_ANALYTICS = False
+
+format = '%(asctime)s %(name)s %(levelname)s [%(funcName)s] %(message)s'
+
+def setup_logging():
     if DEBUG:
         level = logging.DEBUG
     else:
         level = logging.WARNING
-    format = '%(asctime)s %(name)s %(levelname)s [%(funcName)s] %(message)s'
     logging.basicConfig(level=level, format=format)
 
     # Remove root log handlers:
     for h in logging.root.handlers:
         logging.root.removeHandler(h)
 
+def create_book(firm_name, output_dir):
+    """
+    Create a limit order book that logs its output for a single firm.
+
+    Parameters
+    ----------
+    firm_name : str
+        Firm name used to name the output files.
+    output_dir : str
+        Directory in which to write the output files.
+
+    Returns
+    -------
+    lob : _lob.LimitOrderBook
+        New limit order book.
+
+    """
+
     # Set up output files:
     events_log_file = os.path.join(output_dir, 'events-' + firm_name + '.log')
     daily_stats_log_file = os.path.join(output_dir, 'daily_stats-' + firm_name + '.log')
-    
+
+    if MAX_LEVEL_TICKS is not None:
+        far_levels_log_file = os.path.join(output_dir, 'far_levels-' + firm_name + '.log')
+    else:
+        far_levels_log_file = None
+
+    if QUEUE_ANALYTICS:
+        analytics = _analytics.QueueAnalytics(
+            orders_log_file=os.path.join(output_dir, 'orders-' + firm_name + '.log'),
+            levels_log_file=os.path.join(output_dir, 'levels-' + firm_name + '.log'),
+            daily_stats_log_file=os.path.join(output_dir, 'queue_stats-' + firm_name + '.log'))
+    else:
+        analytics = None
+
     # Instantiate simulation:
     lob = _lob.LimitOrderBook(show_output=False, sparse_events=True,
                               events_log_file=events_log_file,
                               stats_log_file=None,
-                              daily_stats_log_file=daily_stats_log_file)
+                              daily_stats_log_file=daily_stats_log_file,
+                              max_resting_orders=MAX_RESTING_ORDERS,
+                              max_level_ticks=MAX_LEVEL_TICKS,
+                              max_order_age=MAX_ORDER_AGE,
+                              far_levels_log_file=far_levels_log_file,
+                              analytics=analytics)
+
+    # Log the messages of each firm's book separately:
+    lob.logger = logging.getLogger('lob.' + firm_name)
 
     # Only create log file when in debug mode:
     if DEBUG:
@@ -62,36 +115,136 @@ if __name__ == '__main__':
         fh = logging.FileHandler(log_file, 'w')
         fh.setFormatter(logging.Formatter(format))
         lob.logger.addHandler(fh)
+    return lob
 
-    # Process all available files; assumes that the files are named in
-    # a way such that their sort order corresponds to the
-    # chronological order of their respective contents:    
-    for file_name in sorted(file_name_list):
+def close_book(lob):
+    """
+    Close the output files and log file handlers of a limit order book.
+    """
 
-        # Check whether input file is compressed:
-        with gzip.open(file_name, 'rb') as f:
-            try:
-                f.read(1)
-            except IOError:
-                compression = None
-            else:
-                compression = 'gzip'
+    lob.close()
+    for h in lob.logger.handlers[:]:
+        lob.logger.removeHandler(h)
+        h.close()
+
+def run(firm_name, output_dir, file_name_list):
+    """
+    Run the simulation on the order data of a single firm.
 
-        tp = pandas.read_csv(file_name,
-                             names=_lob.col_names,
-                             iterator=True,
-                             compression=compression)
-        while True:
+    Parameters
+    ----------
+    firm_name : str
+        Firm name used to name the output files.
+    output_dir : str
+        Directory in which to write the output files.
+    file_name_list : list of str
+        Names of input files.
+
+    """
+
+    start = time.time()
+    lob = create_book(firm_name, output_dir)
+
+    # Make sure that the output files are closed before the next job starts,
+    # even if this one fails:
+    try:
+
+        # Process all available files; assumes that the files are named in
+        # a way such that their sort order corresponds to the
+        # chronological order of their respective contents:
+        for file_name in sorted(file_name_list):
+            for rows in _lob.read_rows(file_name, 500):
+
+                # Drop orders that cannot affect the book before parsing
+                # them; until the expiry date is determined by the first
+                # order processed, orders with other expiry dates are
+                # skipped by the book itself:
+                rows = _lob.filter_orders(rows,
+                                          expiry_date=lob.expiry_date or None,
+                                          start_time=START_TIME,
+                                          end_time=END_TIME,
+                                          activity_types=(1, 3, 4))
+                if rows:
+                    lob.process(_lob.rows_to_orders(rows))
+
+        lob.record_daily_stats(lob.day)
+        lob.print_daily_stats()
+        lob.print_retention_stats()
+        print 'Processing time:              ', (time.time()-start)
+    finally:
+        close_book(lob)
+        del lob
+
+def print_peak_memory(f=sys.stdout):
+    """
+    Display the peak memory usage of the process.
+    """
+
+    f.write('Peak memory of process (kB):   %s\n' % _lob.peak_memory())
+
+def run_worker(f_in, f_out):
+    """
+    Run the simulation on each job read from a file.
+
+    Parameters
+    ----------
+    f_in : file
+        File from which jobs are read, one per line.
+    f_out : file
+        File to which the status of each job is written.
+
+    """
+
+    for line in iter(f_in.readline, ''):
+        args = line.split()
+        if not args:
+            continue
+        if len(args) < 3:
+            f_out.write('error: invalid job: %s\n' % line.strip())
+        else:
+
+            # Keep the simulation output separate from the job status:
+            stdout = sys.stdout
+            sys.stdout = sys.stderr
             try:
-                data = tp.get_chunk(500)
-            except StopIteration:
-                break
+                run(args[0], args[1], args[2:])
+            except Exception as e:
+                f_out.write('error: %s: %s\n' % (args[0], e))
             else:
-                # Process orders that occurred before a certain cutoff time:
-                #if data.irow(0)['trans_time'] > '09:25:00.000000':
-                #    break        
-                lob.process(data)
-
-    lob.record_daily_stats(lob.day)
-    lob.print_daily_stats()
-    print 'Processing time:              ', (time.time()-start)
+                f_out.write('done: %s\n' % args[0])
+            finally:
+                sys.stdout = stdout
+        f_out.flush()
+
+def main():
+    if len(sys.argv) == 2 and sys.argv[1] == '--worker':
+        setup_logging()
+        run_worker(sys.stdin, sys.stdout)
+        print_peak_memory(sys.stderr)
+    elif len(sys.argv) == 3 and sys.argv[1] == '--socket':
+        import SocketServer
+
+        class JobHandler(SocketServer.StreamRequestHandler):
+            def handle(self):
+                run_worker(self.rfile, self.wfile)
+
+        setup_logging()
+        server = SocketServer.UnixStreamServer(sys.argv[2], JobHandler)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            os.remove(sys.argv[2])
+            print_peak_memory(sys.stderr)
+    elif len(sys.argv) < 4:
+        print usage
+        sys.exit(0)
+    else:
+        firm_name, output_dir = sys.argv[1:3]
+        file_name_list = sys.argv[3:]
+        setup_logging()
+        run(firm_name, output_dir, file_name_list)
+        print_peak_memory()
+
+if __name__ == '__main__':
+    main()
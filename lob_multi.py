@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+"""
+Limit order book simulation for multiple securities traded on an Indian
+security exchange.
+"""
+
+# Copyright (c) 2012-2014, Lev Givon
+# All rights reserved.
+# Distributed under the terms of the BSD license:
+# http://www.opensource.org/licenses/bsd-license
+
+import _lob
+import lob
+
+import csv
+import heapq
+import itertools
+import os
+import sys
+import time
+
+usage = \
+"""
+Usage: %s <output directory> <snapshot interval> <input file names>
+
+Orders in all input files are processed in chronological order by a separate
+limit order book for each symbol. The best bid and ask of every book are logged
+at the specified interval (in seconds).
+""" % sys.argv[0]
+
+def seconds_to_time(t):
+    """
+    Convert seconds since midnight to a transaction time (HH:MM:SS.XXXXXX).
+    """
+
+    m, s = divmod(t, 60)
+    h, m = divmod(int(m), 60)
+    return '%02i:%02i:%09.6f' % (h, m, s)
+
+def group_files(file_name_list):
+    """
+    Group input files by firm.
+
+    Parameters
+    ----------
+    file_name_list : list of str
+        Names of input files. The firm name is assumed to precede the string
+        '-orders' in each file name.
+
+    Returns
+    -------
+    groups : list of list of str
+        Sorted lists of file names for each firm.
+
+    """
+
+    groups = {}
+    for file_name in file_name_list:
+        firm_name = os.path.basename(file_name).split('-orders')[0]
+        groups.setdefault(firm_name, []).append(file_name)
+    return [sorted(groups[firm_name]) for firm_name in sorted(groups)]
+
+def read_stream(index, file_name_list):
+    """
+    Read the orders in a sequence of files.
+
+    Parameters
+    ----------
+    index : int
+        Index of the stream; used to order orders with identical transaction
+        times in different streams.
+    file_name_list : list of str
+        Names of input files; assumes that the sort order of the files
+        corresponds to the chronological order of their respective contents.
+
+    Returns
+    -------
+    orders : generator
+        Generator of tuples whose first entries are sort keys and whose last
+        entries are orders.
+
+    """
+
+    counter = itertools.count()
+    for file_name in file_name_list:
+        for rows in _lob.read_rows(file_name, 500):
+            rows = _lob.filter_orders(rows,
+                                      start_time=lob.START_TIME,
+                                      end_time=lob.END_TIME,
+                                      activity_types=(1, 3, 4))
+            for order in _lob.rows_to_orders(rows):
+
+                # Transaction dates are MM/DD/YYYY:
+                d = order['trans_date']
+                yield (d[6:10], d[0:2], d[3:5], order['trans_time'],
+                       index, counter.next(), order)
+
+def run(output_dir, interval, file_name_list):
+    """
+    Run the simulation on the order data of multiple firms.
+
+    Parameters
+    ----------
+    output_dir : str
+        Directory in which to write the output files.
+    interval : float
+        Interval (in seconds) between snapshots of the best bid and ask of all
+        books.
+    file_name_list : list of str
+        Names of input files.
+
+    """
+
+    start = time.time()
+
+    # Merge the order streams of all firms in chronological order:
+    streams = [read_stream(i, group) for i, group in \
+               enumerate(group_files(file_name_list))]
+    orders = heapq.merge(*streams)
+
+    # Snapshots of all books are written to this file:
+    snapshots_log_fh = open(os.path.join(output_dir, 'snapshots.log'), 'w')
+    snapshots_log_writer = csv.writer(snapshots_log_fh)
+
+    # These dictionaries map symbols to their limit order books and to the
+    # dates of the last orders processed by each book:
+    books = {}
+    book_dates = {}
+
+    date = None
+    next_snapshot = None
+    for entry in orders:
+        order = entry[-1]
+        t = _lob.time_to_seconds(order['trans_time'])
+        if order['trans_date'] != date:
+            date = order['trans_date']
+            next_snapshot = (t//interval+1)*interval
+
+        # Record the best bid and ask of the books at each snapshot time
+        # that precedes the current order; books that have not yet processed
+        # any orders from the current day are skipped:
+        while t >= next_snapshot:
+            snapshot_time = seconds_to_time(next_snapshot)
+            for symbol in sorted(books):
+                if book_dates[symbol] != date:
+                    continue
+                best_bid_price, best_bid_volume_original, _ = \
+                    books[symbol].best_bid_data()
+                best_ask_price, best_ask_volume_original, _ = \
+                    books[symbol].best_ask_data()
+                snapshots_log_writer.writerow([date, snapshot_time, symbol,
+                                               best_bid_price,
+                                               best_bid_volume_original,
+                                               best_ask_price,
+                                               best_ask_volume_original])
+            next_snapshot += interval
+
+        symbol = order['symbol']
+        try:
+            book = books[symbol]
+        except KeyError:
+            book = books[symbol] = lob.create_book(symbol, output_dir)
+        book.process([order])
+        book_dates[symbol] = date
+
+    snapshots_log_fh.close()
+    for symbol in sorted(books):
+        books[symbol].record_daily_stats(books[symbol].day)
+        print '--------------------------------------------'
+        print 'Symbol:                       ', symbol
+        books[symbol].print_daily_stats()
+        books[symbol].print_retention_stats()
+    print '--------------------------------------------'
+    print 'Processing time:              ', (time.time()-start)
+    lob.print_peak_memory()
+
+    # Make sure that the output files are closed:
+    for symbol in books:
+        lob.close_book(books[symbol])
+    books.clear()
+
+def main():
+    if len(sys.argv) < 4:
+        print usage
+        sys.exit(0)
+    else:
+        output_dir = sys.argv[1]
+        try:
+            interval = float(sys.argv[2])
+        except ValueError:
+            print usage
+            sys.exit(1)
+        if interval <= 0:
+            print 'snapshot interval must be positive'
+            sys.exit(1)
+        file_name_list = sys.argv[3:]
+        lob.setup_logging()
+        run(output_dir, interval, file_name_list)
+
+if __name__ == '__main__':
+    main()
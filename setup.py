@@ -26,7 +26,8 @@ CLASSIFIERS = [
     'Operating System :: OS Independent',
     'Programming Language :: Python']
 
-ext_modules = [Extension('_lob', ['_lob.pyx'])]
+ext_modules = [Extension('_lob', ['_lob.pyx']),
+               Extension('_analytics', ['_analytics.pyx'])]
 
 if __name__ == '__main__':
     if os.path.exists('MANIFEST'):
@@ -47,5 +48,8 @@ if __name__ == '__main__':
                               'pandas >= 0.10',
                               'rbtree >= 0.9.0'],
           ext_modules = ext_modules,
+          py_modules = ['lob', 'lob_multi'],
+          entry_points = {'console_scripts': ['nseindia_lob = lob:main',
+                                              'nseindia_lob_multi = lob_multi:main']},
           cmdclass = {'build_ext': build_ext},
     )